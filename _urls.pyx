@@ -0,0 +1,60 @@
+# cython: language_level=3
+"""Compiled link normalization used by EnhancedDataCollector.normalize_links
+
+Optional speedup; app.py falls back to pure Python when this is not built.
+Build in place with:  cythonize -i _urls.pyx
+"""
+from urllib.parse import urljoin, urlparse, urlunparse
+
+
+cdef bint _is_plain_absolute(str url):
+    """True for http(s) URLs that urljoin/urlunparse would return unchanged,
+    apart from the fragment"""
+    cdef Py_ssize_t start, i, n = len(url)
+    cdef Py_UCS4 c
+
+    if url.startswith('https://'):
+        start = 8
+    elif url.startswith('http://'):
+        start = 7
+    else:
+        return False
+    # An empty host is resolved against the base URL
+    if start >= n or url[start] == '/':
+        return False
+
+    for i in range(start, n):
+        c = url[i]
+        if c == '#':
+            break
+        # Queries, params, whitespace and IPv6 brackets go through urlparse,
+        # which normalizes the first ones and validates the brackets
+        if c == '?' or c == ';' or c <= ' ' or c == '[' or c == ']':
+            return False
+    return True
+
+
+cpdef set normalize_links_c(object hrefs, str base_url):
+    """Resolve hrefs against base_url, drop fragments and keep http(s) URLs"""
+    cdef set links = set()
+    cdef str url
+    cdef Py_ssize_t cut
+
+    for href in hrefs:
+        url = href
+        if _is_plain_absolute(url):
+            cut = url.find('#')
+            if cut >= 0:
+                url = url[:cut]
+        else:
+            try:
+                parsed = urlparse(urljoin(base_url, url))
+                url = urlunparse((parsed.scheme, parsed.netloc, parsed.path,
+                                  parsed.params, parsed.query, ''))
+            except ValueError:
+                # Malformed href, e.g. an unclosed IPv6 bracket
+                continue
+            if not url.startswith(('http://', 'https://')):
+                continue
+        links.add(url)
+    return links
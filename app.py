@@ -2,27 +2,89 @@ import asyncio
 import aiohttp
 import aiofiles
 import json
+import orjson
 import logging
 import random
 import re
 import signal
+import sqlite3
 import sys
 import time
 import hashlib
+import xxhash
+from array import array
+from collections import deque
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Set
+from typing import Iterable, List, Dict, Optional, Set, Tuple
 from urllib.parse import urljoin, urlparse, urlunparse
-from bs4 import BeautifulSoup
+from lxml import etree
+from lxml import html as lxml_html
 from pathlib import Path
 
 try:
-    import tldextract
     from langdetect import detect, LangDetectException
     LANG_DETECT_AVAILABLE = True
 except ImportError:
     LANG_DETECT_AVAILABLE = False
     print("Warning: langdetect not available. Language detection disabled.")
 
+try:
+    import fasttext
+    FASTTEXT_AVAILABLE = True
+except ImportError:
+    FASTTEXT_AVAILABLE = False
+
+try:
+    from pybloom_live import ScalableBloomFilter
+    BLOOM_AVAILABLE = True
+except ImportError:
+    BLOOM_AVAILABLE = False
+    print("Warning: pybloom_live not available. Falling back to an in-memory hash set for duplicate detection.")
+
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+try:
+    # Optional compiled link normalizer, built with: cythonize -i _urls.pyx
+    from _urls import normalize_links_c
+    URLS_EXT_AVAILABLE = True
+except ImportError:
+    URLS_EXT_AVAILABLE = False
+
+try:
+    from blake3 import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Naive utcnow() timestamps are serialized as ISO 8601 with a trailing Z
+_ORJSON_OPTS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+# Numbers and ISO dates vary between renders of otherwise identical pages
+_VOLATILE_RE = re.compile(r'\b\d{4}-\d{2}-\d{2}\b|\d+')
+SHINGLE_SIZE = 5
+
+# Pages larger than this are hashed in a worker thread. The pure-Python
+# simhash is far slower per byte than the digest, so it moves off sooner.
+LARGE_PAGE_BYTES = 1024 * 1024
+SIMHASH_OFFLOAD_CHARS = 64 * 1024
+
+# Elements whose text never counts as page content
+STRIPPED_TAGS = ("script", "style", "nav", "footer", "header", "aside", "iframe")
+
+# Used for documents lxml will not accept as str (XML encoding declarations)
+_UTF8_HTML_PARSER = lxml_html.HTMLParser(encoding='utf-8')
+
+
+def url_key(url: str) -> int:
+    """64-bit hash used in place of the URL string in membership sets"""
+    return xxhash.xxh3_64_intdigest(url.encode('utf-8'))
+
 # --- LOGGING SETUP ---
 logging.basicConfig(
     level=logging.INFO,
@@ -74,25 +136,212 @@ class Statistics:
         logger.info("=" * 80)
 
 
+class URLFrontier:
+    """FIFO crawl queue served round-robin by host, spilling to SQLite when large"""
+    SPILL_BATCH = 1000
+    
+    def __init__(self, spill_path: str, max_in_memory: int = 50000):
+        self.spill_path = spill_path
+        self.max_in_memory = max_in_memory
+        self._seen: Set[int] = set()  # url_key() of every URL ever queued
+        self._queues: Dict[str, deque] = {}  # host -> pending URLs
+        self._hosts = deque()  # Hosts with pending URLs, in turn order
+        self._in_memory = 0
+        self._spill_buffer: List[str] = []
+        self._spilled = 0
+        self._refilled_id = 0  # Last spill row moved back into memory
+        self._db = None
+    
+    def __len__(self) -> int:
+        return self._in_memory + self._spilled
+    
+    def __contains__(self, url: str) -> bool:
+        return url_key(url) in self._seen
+    
+    @property
+    def spilled(self) -> int:
+        """Number of queued URLs held in the spill file"""
+        return self._spilled
+    
+    @property
+    def seen_keys(self) -> Set[int]:
+        """url_key() of every URL ever queued, including those already crawled"""
+        return self._seen
+    
+    @property
+    def refilled_id(self) -> int:
+        """Id of the last spill row moved back into memory"""
+        return self._refilled_id
+    
+    def add(self, url: str) -> bool:
+        """Queue a URL unless it has been seen before"""
+        key = url_key(url)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        
+        # Once anything has spilled, newer URLs queue behind it on disk
+        if self._spilled or self._in_memory >= self.max_in_memory:
+            self._spill_buffer.append(url)
+            self._spilled += 1
+            if len(self._spill_buffer) >= self.SPILL_BATCH:
+                self.flush()
+        else:
+            self._enqueue(url)
+        return True
+    
+    def mark_seen(self, keys: Iterable[int]):
+        """Remember URLs, given by url_key(), without queueing them"""
+        self._seen.update(keys)
+    
+    def pop(self) -> Optional[str]:
+        """Take the next URL, rotating between hosts"""
+        # Refill at a low-water mark so the hosts in memory stay varied
+        if self._spilled and self._in_memory < max(self.max_in_memory // 2, 1):
+            self._refill()
+        if not self._hosts:
+            return None
+        
+        host = self._hosts.popleft()
+        queue = self._queues[host]
+        url = queue.popleft()
+        self._in_memory -= 1
+        if queue:
+            self._hosts.append(host)
+        else:
+            del self._queues[host]
+        return url
+    
+    def snapshot(self) -> List[str]:
+        """URLs currently held in memory (spilled URLs stay on disk)"""
+        return [url for queue in self._queues.values() for url in queue]
+    
+    def restore(self, urls: List[str], attach_spill: bool = False, refilled_id: int = 0):
+        """Replace the in-memory queue, optionally reattaching a previous spill file.
+        
+        Spill rows up to refilled_id were already in memory when urls was saved.
+        """
+        self._queues.clear()
+        self._hosts.clear()
+        self._in_memory = 0
+        self._spill_buffer = []
+        self._spilled = 0
+        self._refilled_id = 0
+        
+        for url in urls:
+            self._seen.add(url_key(url))
+            self._enqueue(url)
+        
+        if attach_spill and Path(self.spill_path).exists():
+            self._connect(keep_existing=True)
+            # Left behind if the run stopped before release_refilled()
+            self._db.execute("DELETE FROM frontier WHERE id <= ?", (refilled_id,))
+            self._db.commit()
+            for (url,) in self._db.execute("SELECT url FROM frontier"):
+                self._seen.add(url_key(url))
+                self._spilled += 1
+    
+    def flush(self):
+        """Write buffered overflow URLs to the spill file"""
+        if not self._spill_buffer:
+            return
+        if self._db is None:
+            self._connect()
+        self._db.executemany("INSERT INTO frontier (url) VALUES (?)", ((url,) for url in self._spill_buffer))
+        self._db.commit()
+        self._spill_buffer = []
+    
+    def release_refilled(self, up_to_id: int):
+        """Delete refilled spill rows up to up_to_id once a checkpoint holds them.
+        
+        Until then the rows stay on disk, so a crash after a refill does not lose them.
+        """
+        if self._db is None or not up_to_id:
+            return
+        self._db.execute("DELETE FROM frontier WHERE id <= ?", (up_to_id,))
+        self._db.commit()
+    
+    def close(self):
+        """Flush and close the spill file"""
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+    
+    def _enqueue(self, url: str):
+        host = urlparse(url).netloc
+        queue = self._queues.get(host)
+        if queue is None:
+            queue = self._queues[host] = deque()
+            self._hosts.append(host)
+        queue.append(url)
+        self._in_memory += 1
+    
+    def _refill(self):
+        """Move the oldest spilled URLs back into memory"""
+        self.flush()
+        rows = self._db.execute(
+            "SELECT id, url FROM frontier WHERE id > ? ORDER BY id LIMIT ?",
+            (self._refilled_id, max(self.max_in_memory // 2, 1))
+        ).fetchall()
+        if not rows:
+            self._spilled = 0
+            return
+        # Rows stay in the file until a checkpoint covering them calls release_refilled()
+        self._refilled_id = rows[-1][0]
+        for _, url in rows:
+            self._enqueue(url)
+        self._spilled -= len(rows)
+    
+    def _connect(self, keep_existing: bool = False):
+        self._db = sqlite3.connect(self.spill_path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")
+        if not keep_existing:
+            self._db.execute("DROP TABLE IF EXISTS frontier")
+            self._refilled_id = 0
+        self._db.execute("CREATE TABLE IF NOT EXISTS frontier (id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL)")
+        self._db.commit()
+
+
 class EnhancedDataCollector:
     def __init__(self, config_path: str = "config.json"):
         self.config = self.load_config(config_path)
         self.stats = Statistics()
+        self._allowed_domains = frozenset(
+            domain.lower().lstrip('.') for domain in self.config["allowed_domains"]
+        )
+        # str.endswith() accepts a tuple and checks every suffix in C
+        self._code_extensions = tuple(ext.lower() for ext in self.config["code_extensions"])
         
         # URL management
-        self.urls_to_visit = set(self.config["seed_urls"])
-        self.visited_urls = set()
+        self.url_frontier = URLFrontier(
+            self.config["output"].get("frontier_file", "crawler_frontier.db"),
+            self.config["crawling"].get("max_queue_in_memory", 50000)
+        )
+        for url in self.config["seed_urls"]:
+            self.url_frontier.add(url)
+        self.visited_count = 0  # Crawled URLs; their keys live in url_frontier.seen_keys
         self.failed_urls = {}  # URL -> failure count
-        self.content_hashes = set()  # For duplicate detection
+        self.content_hashes = self.create_content_index()  # For duplicate detection
+        self.recent_fingerprints = deque(maxlen=self.config["data_quality"].get("near_duplicate_window", 5000))
+        self._lid = self.load_language_model()
         
         # Runtime control
         self.running = True
         self.start_time = None
         self.end_time = None
         
+        # Earliest loop time each host may be requested again
+        self._host_next_ok: Dict[str, float] = {}
+        
         # Semaphore for concurrency control
         self.semaphore = asyncio.Semaphore(self.config["crawling"]["max_concurrent_requests"])
         
+        # Output file stays open for the whole run; writes are buffered
+        self._data_fh = None
+        self._data_lock = asyncio.Lock()
+        
         # User agents for rotation
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -134,57 +383,162 @@ class EnhancedDataCollector:
         if not self.config["crawling"]["follow_external_links"]:
             return True
             
-        parsed = urlparse(url)
-        domain = parsed.netloc.lower()
+        try:
+            host = urlparse(url).hostname or ""
+        except ValueError:
+            # Malformed netloc, e.g. an unclosed IPv6 bracket
+            return False
+        if host in self._allowed_domains:
+            return True
         
-        for allowed in self.config["allowed_domains"]:
-            if allowed in domain:
-                return True
-        return False
+        # Parent domains, so entries match subdomains and may themselves name one,
+        # e.g. pandas.pydata.org
+        labels = host.split('.')
+        return any('.'.join(labels[i:]) in self._allowed_domains for i in range(1, len(labels) - 1))
     
     def is_code_url(self, url: str) -> bool:
         """Check if URL points to a code file"""
-        path = urlparse(url).path.lower()
-        for ext in self.config["code_extensions"]:
-            if path.endswith(ext):
-                return True
-        return False
+        return urlparse(url).path.lower().endswith(self._code_extensions)
     
-    def extract_links(self, html: str, base_url: str) -> Set[str]:
-        """Extract and normalize links from HTML"""
+    def normalize_links(self, hrefs: Iterable[str], base_url: str) -> Set[str]:
+        """Normalize and filter raw href values found on a page"""
         links = set()
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            for tag in soup.find_all(['a', 'link'], href=True):
-                href = tag['href']
-                # Normalize URL
-                absolute_url = urljoin(base_url, href)
-                
-                # Remove fragments
-                parsed = urlparse(absolute_url)
-                clean_url = urlunparse((parsed.scheme, parsed.netloc, parsed.path, 
-                                       parsed.params, parsed.query, ''))
-                
-                # Filter valid URLs
-                if clean_url.startswith(('http://', 'https://')) and self.is_allowed_domain(clean_url):
-                    links.add(clean_url)
+            if URLS_EXT_AVAILABLE:
+                links = normalize_links_c(hrefs, base_url)
+            else:
+                for href in hrefs:
+                    try:
+                        # Normalize URL
+                        absolute_url = urljoin(base_url, href)
+                        
+                        # Remove fragments
+                        parsed = urlparse(absolute_url)
+                        clean_url = urlunparse((parsed.scheme, parsed.netloc, parsed.path, 
+                                               parsed.params, parsed.query, ''))
+                    except ValueError:
+                        # One malformed href (e.g. "http://[bad/") skips only itself
+                        continue
+                    
+                    if clean_url.startswith(('http://', 'https://')):
+                        links.add(clean_url)
         except Exception as e:
             logger.debug(f"Error extracting links: {e}")
         
-        return links
+        # Filter valid URLs, once per distinct link
+        return {link for link in links if self.is_allowed_domain(link)}
     
     def clean_text(self, text: str) -> str:
         """Clean extracted text"""
-        text = re.sub(r'\s+', ' ', text)
-        return text.strip()
+        return _WHITESPACE_RE.sub(' ', text).strip()
+    
+    def get_content_hash(self, content: str) -> int:
+        """Generate a 64-bit simhash of word shingles for near-duplicate detection"""
+        tokens = _VOLATILE_RE.sub(' ', content.lower()).split()
+        shingles = {
+            ' '.join(tokens[i:i + SHINGLE_SIZE])
+            for i in range(max(len(tokens) - SHINGLE_SIZE + 1, 1))
+        }
+        
+        # Each shingle hash votes on every bit; the majority wins
+        bits = [
+            format(int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big'), '064b')
+            for shingle in shingles
+        ]
+        threshold = len(bits) / 2
+        fingerprint = 0
+        for column in zip(*bits):
+            fingerprint = (fingerprint << 1) | (column.count('1') > threshold)
+        return fingerprint
+    
+    def get_content_digest(self, data: bytes) -> bytes:
+        """Generate a 128-bit digest of the exact page text"""
+        if BLAKE3_AVAILABLE:
+            return blake3(data).digest(16)
+        return hashlib.blake2b(data, digest_size=16).digest()
+    
+    def create_content_index(self):
+        """Create the structure that remembers content hashes"""
+        if not BLOOM_AVAILABLE:
+            return set()
+        return ScalableBloomFilter(
+            initial_capacity=self.config["data_quality"].get("dedup_capacity", 1000000),
+            error_rate=self.config["data_quality"].get("dedup_error_rate", 1e-7)
+        )
     
-    def get_content_hash(self, content: str) -> str:
-        """Generate hash for duplicate detection"""
-        return hashlib.md5(content.encode('utf-8')).hexdigest()
+    def remember_content_key(self, key) -> bool:
+        """Record a content key and report whether it was already seen"""
+        if BLOOM_AVAILABLE:
+            # pybloom_live hashes non-str keys as str(key).encode(), so a raw digest would
+            # be hashed as its much longer b'\x..' repr; hex is the compact str form
+            if isinstance(key, bytes):
+                key = key.hex()
+            # add() returns True when the key was (probably) present already
+            return self.content_hashes.add(key)
+        if key in self.content_hashes:
+            return True
+        self.content_hashes.add(key)
+        return False
+    
+    def is_duplicate_content(self, fingerprint: int) -> bool:
+        """Record a content fingerprint and report whether it matches a seen page"""
+        if self.remember_content_key(fingerprint):
+            return True
+        
+        # Near duplicates: recent fingerprints within a few differing bits
+        max_distance = self.config["data_quality"].get("near_duplicate_distance", 3)
+        for other in self.recent_fingerprints:
+            if bin(fingerprint ^ other).count('1') <= max_distance:
+                return True
+        self.recent_fingerprints.append(fingerprint)
+        return False
+    
+    async def is_duplicate_page(self, text: str, encoded: bytes) -> bool:
+        """Check page text for exact repeats first, then for near duplicates"""
+        if self.remember_content_key(await self.run_hash(self.get_content_digest, encoded, LARGE_PAGE_BYTES)):
+            return True
+        return self.is_duplicate_content(await self.run_hash(self.get_content_hash, text, SIMHASH_OFFLOAD_CHARS))
+    
+    async def run_hash(self, func, data, threshold: int):
+        """Run a hash function, off the event loop when data is longer than threshold"""
+        if len(data) > threshold:
+            return await asyncio.get_running_loop().run_in_executor(None, func, data)
+        return func(data)
+    
+    def load_language_model(self):
+        """Load the fastText language identification model, if available"""
+        if not FASTTEXT_AVAILABLE or not self.config["data_quality"]["detect_language"]:
+            return None
+        model_path = Path(self.config["data_quality"].get("language_model", "lid.176.ftz"))
+        if not model_path.exists():
+            logger.info(f"fastText model {model_path} not found, using langdetect for language detection")
+            return None
+        try:
+            return fasttext.load_model(str(model_path))
+        except ValueError as e:
+            logger.warning(f"Could not load fastText model {model_path}: {e}")
+            return None
     
     def detect_language(self, text: str) -> Optional[str]:
         """Detect language of text"""
-        if not LANG_DETECT_AVAILABLE or not self.config["data_quality"]["detect_language"]:
+        if not self.config["data_quality"]["detect_language"]:
+            return None
+        
+        # fastText is compiled and far faster than langdetect; inputs are already capped by callers.
+        # The low-level predict returns [(prob, label)] and avoids the numpy conversion in
+        # FastText.predict, which fails on numpy 2.
+        if self._lid is not None:
+            try:
+                predictions = self._lid.f.predict(text.replace('\n', ' ') + '\n', 1, 0.0, 'strict')
+                if not predictions:
+                    return None
+                prob, label = predictions[0]
+                return label[len('__label__'):] if prob > 0.5 else None
+            except Exception as e:
+                logger.warning(f"⚠️ fastText prediction failed, falling back to langdetect: {e}")
+                self._lid = None
+        
+        if not LANG_DETECT_AVAILABLE:
             return None
         try:
             return detect(text)
@@ -196,19 +550,29 @@ class EnhancedDataCollector:
         async with self.semaphore:
             retries = 0
             retry_limit = self.config["crawling"]["retry_limit"]
+            max_bytes = int(self.config["data_quality"]["max_page_size_mb"] * 1024 * 1024)
             
             while retries < retry_limit:
                 try:
-                    timeout = aiohttp.ClientTimeout(total=self.config["crawling"]["request_timeout_seconds"])
-                    async with session.get(url, headers=self.get_random_headers(), timeout=timeout) as response:
+                    async with session.get(url, headers=self.get_random_headers()) as response:
                         if response.status == 200:
-                            content = await response.text()
-                            # Check size limit
-                            size_mb = len(content.encode('utf-8')) / (1024 * 1024)
-                            if size_mb > self.config["data_quality"]["max_page_size_mb"]:
-                                logger.warning(f"Page too large ({size_mb:.2f}MB): {url}")
+                            # Check size limit while streaming, before the whole body is buffered
+                            if response.content_length and response.content_length > max_bytes:
+                                logger.warning(f"Page too large ({response.content_length / (1024 * 1024):.2f}MB): {url}")
                                 return None
-                            return content
+                            
+                            body = bytearray()
+                            async for chunk in response.content.iter_chunked(65536):
+                                body.extend(chunk)
+                                if len(body) > max_bytes:
+                                    logger.warning(f"Page too large (over {max_bytes / (1024 * 1024):.2f}MB): {url}")
+                                    return None
+                            
+                            try:
+                                return body.decode(response.charset or 'utf-8', errors='replace')
+                            except LookupError:
+                                # Unknown charset name in the Content-Type header
+                                return body.decode('utf-8', errors='replace')
                         elif response.status in [429, 503]:
                             wait_time = 2 ** retries
                             logger.warning(f"Rate limited on {url}. Retrying in {wait_time}s...")
@@ -245,7 +609,7 @@ class EnhancedDataCollector:
             return {
                 "type": "code",
                 "url": url,
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": datetime.utcnow(),
                 "file_extension": extension,
                 "language": language,
                 "code": content[:50000],  # Limit code size
@@ -256,72 +620,94 @@ class EnhancedDataCollector:
             logger.debug(f"Error parsing code from {url}: {e}")
             return None
     
-    def parse_content(self, html: str, url: str) -> Optional[Dict]:
-        """Extract relevant data from HTML"""
+    def parse_html(self, html: str):
+        """Parse an HTML document into an lxml tree"""
+        try:
+            return lxml_html.document_fromstring(html)
+        except ValueError:
+            # lxml rejects str input that carries an XML encoding declaration
+            return lxml_html.document_fromstring(html.encode('utf-8'), parser=_UTF8_HTML_PARSER)
+    
+    async def parse_content(self, html: str, url: str) -> Tuple[Optional[Dict], Set[str]]:
+        """Extract relevant data and outgoing links from HTML in a single parse"""
+        links = set()
         try:
-            soup = BeautifulSoup(html, 'html.parser')
+            doc = self.parse_html(html)
             
-            # Remove unwanted tags
-            for script in soup(["script", "style", "nav", "footer", "header", "aside", "iframe"]):
-                script.decompose()
+            # Collect links before nav/footer are stripped below
+            if self.config["crawling"]["follow_external_links"]:
+                links = self.normalize_links(
+                    (href for href in (el.get('href') for el in doc.iter('a', 'link')) if href is not None), url
+                )
+            
+            # Remove unwanted tags in one pass. Their tail text is kept and merged
+            # into the preceding text, so pad it to keep words apart.
+            for element in doc.iter(*STRIPPED_TAGS):
+                if element.tail:
+                    element.tail = ' ' + element.tail
+            etree.strip_elements(doc, *STRIPPED_TAGS, with_tail=False)
             
             # Get Title
-            title = soup.title.string if soup.title else "No Title"
+            title = doc.findtext('.//title') or "No Title"
             
             # Get meta description
             meta_desc = ""
-            meta_tag = soup.find('meta', attrs={'name': 'description'})
-            if meta_tag and meta_tag.get('content'):
-                meta_desc = meta_tag['content']
+            meta_tag = doc.find('.//meta[@name="description"]')
+            if meta_tag is not None and meta_tag.get('content'):
+                meta_desc = meta_tag.get('content')
             
             # Get keywords
             keywords = ""
-            keywords_tag = soup.find('meta', attrs={'name': 'keywords'})
-            if keywords_tag and keywords_tag.get('content'):
-                keywords = keywords_tag['content']
+            keywords_tag = doc.find('.//meta[@name="keywords"]')
+            if keywords_tag is not None and keywords_tag.get('content'):
+                keywords = keywords_tag.get('content')
             
             # Get Main Text Content
             text_content = ""
             
             # Priority: Article tag -> Main tag -> Body
-            main_node = soup.find('article') or soup.find('main') or soup.body
+            main_node = doc.find('.//article')
+            if main_node is None:
+                main_node = doc.find('.//main')
+            if main_node is None:
+                main_node = doc.find('body')
             
-            if main_node:
-                text_content = main_node.get_text(separator=' ')
+            if main_node is not None:
+                text_content = ' '.join(main_node.itertext())
             
             cleaned_text = self.clean_text(text_content)
+            encoded_text = cleaned_text.encode('utf-8')
             
             # Quality Check
             if len(cleaned_text) < self.config["data_quality"]["min_text_length"]:
-                return None
+                return None, links
             
             # Duplicate detection
             if self.config["data_quality"]["remove_duplicates"]:
-                content_hash = self.get_content_hash(cleaned_text)
-                if content_hash in self.content_hashes:
+                if await self.is_duplicate_page(cleaned_text, encoded_text):
                     self.stats.duplicates_skipped += 1
-                    return None
-                self.content_hashes.add(content_hash)
+                    return None, links
             
             # Detect language
             language = self.detect_language(cleaned_text[:1000])
             
-            return {
+            data = {
                 "type": "webpage",
                 "url": url,
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": datetime.utcnow(),
                 "title": self.clean_text(title),
                 "description": self.clean_text(meta_desc),
                 "keywords": keywords,
                 "content": cleaned_text,
                 "language": language,
-                "size_bytes": len(cleaned_text.encode('utf-8')),
+                "size_bytes": len(encoded_text),
                 "source_domain": urlparse(url).netloc
             }
+            return data, links
         
         except Exception as e:
             logger.debug(f"Error parsing {url}: {e}")
-            return None
+            return None, links
     
     async def save_data(self, data: Dict):
         """Append data to JSONL file asynchronously"""
@@ -329,8 +715,8 @@ class EnhancedDataCollector:
             return
         
         try:
-            async with aiofiles.open(self.config["output"]["data_file"], 'a', encoding='utf-8') as f:
-                await f.write(json.dumps(data, ensure_ascii=False) + "\n")
+            async with self._data_lock:
+                await self._data_fh.write(orjson.dumps(data, option=_ORJSON_OPTS) + b"\n")
             
             # Update statistics
             self.stats.total_bytes += data.get('size_bytes', 0)
@@ -342,19 +728,40 @@ class EnhancedDataCollector:
     async def save_checkpoint(self):
         """Save crawler state for resume capability"""
         try:
+            if self._data_fh is not None:
+                async with self._data_lock:
+                    await self._data_fh.flush()
+            
+            self.url_frontier.flush()
+            # Spill rows refilled by now are part of the snapshot below
+            refilled_id = self.url_frontier.refilled_id
             state = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "visited_urls": list(self.visited_urls),
-                "urls_to_visit": list(self.urls_to_visit),
+                "timestamp": datetime.utcnow(),
+                "visited_count": self.visited_count,
+                "urls_to_visit": self.url_frontier.snapshot(),
+                "queue_size": len(self.url_frontier),
+                "queue_spilled": self.url_frontier.spilled,
+                "queue_refilled_id": refilled_id,
                 "failed_urls": self.failed_urls,
                 "statistics": self.stats.to_dict(),
                 "start_time": self.start_time.isoformat() if self.start_time else None
             }
             
-            async with aiofiles.open(self.config["output"]["checkpoint_file"], 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(state, indent=2, ensure_ascii=False))
+            async with aiofiles.open(self.config["output"]["checkpoint_file"], 'wb') as f:
+                await f.write(orjson.dumps(state, option=_ORJSON_OPTS | orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            
+            # Keys of every visited or queued URL are stored packed, 8 bytes each
+            async with aiofiles.open(self.config["output"].get("visited_file", "crawler_visited.bin"), 'wb') as f:
+                await f.write(array('Q', self.url_frontier.seen_keys).tobytes())
             
-            logger.info(f"💾 Checkpoint saved: {len(self.visited_urls)} visited, {len(self.urls_to_visit)} queued")
+            # The Bloom filter is persisted as its raw bit arrays next to the checkpoint
+            if BLOOM_AVAILABLE:
+                with open(self.config["output"].get("dedup_file", "content_hashes.bloom"), 'wb') as f:
+                    self.content_hashes.tofile(f)
+            
+            self.url_frontier.release_refilled(refilled_id)
+            
+            logger.info(f"💾 Checkpoint saved: {self.visited_count} visited, {len(self.url_frontier)} queued")
         except Exception as e:
             logger.error(f"Error saving checkpoint: {e}")
     
@@ -365,14 +772,32 @@ class EnhancedDataCollector:
             if not checkpoint_path.exists():
                 return False
             
-            async with aiofiles.open(checkpoint_path, 'r', encoding='utf-8') as f:
+            async with aiofiles.open(checkpoint_path, 'rb') as f:
                 content = await f.read()
-                state = json.loads(content)
+                state = orjson.loads(content)
             
-            self.visited_urls = set(state.get("visited_urls", []))
-            self.urls_to_visit = set(state.get("urls_to_visit", []))
+            visited_path = Path(self.config["output"].get("visited_file", "crawler_visited.bin"))
+            if visited_path.exists():
+                keys = array('Q')
+                async with aiofiles.open(visited_path, 'rb') as f:
+                    keys.frombytes(await f.read())
+                self.url_frontier.mark_seen(keys)
+            else:
+                # Checkpoints from older versions list the URLs themselves
+                self.url_frontier.mark_seen(url_key(url) for url in state.get("visited_urls", []))
+            self.visited_count = state.get("visited_count", len(state.get("visited_urls", [])))
+            self.url_frontier.restore(
+                state.get("urls_to_visit", []),
+                attach_spill=state.get("queue_spilled", 0) > 0,
+                refilled_id=state.get("queue_refilled_id", 0)
+            )
             self.failed_urls = state.get("failed_urls", {})
             
+            dedup_path = Path(self.config["output"].get("dedup_file", "content_hashes.bloom"))
+            if BLOOM_AVAILABLE and dedup_path.exists():
+                with open(dedup_path, 'rb') as f:
+                    self.content_hashes = ScalableBloomFilter.fromfile(f)
+            
             # Restore statistics
             stats_data = state.get("statistics", {})
             self.stats.pages_crawled = stats_data.get("pages_crawled", 0)
@@ -384,7 +809,7 @@ class EnhancedDataCollector:
             if state.get("start_time"):
                 self.start_time = datetime.fromisoformat(state["start_time"])
             
-            logger.info(f"✅ Checkpoint loaded: {len(self.visited_urls)} visited, {len(self.urls_to_visit)} queued")
+            logger.info(f"✅ Checkpoint loaded: {self.visited_count} visited, {len(self.url_frontier)} queued")
             return True
         except Exception as e:
             logger.error(f"Error loading checkpoint: {e}")
@@ -392,19 +817,21 @@ class EnhancedDataCollector:
     
     async def process_url(self, session: aiohttp.ClientSession, url: str):
         """Process a single URL"""
-        if url in self.visited_urls:
-            return
-        
-        self.visited_urls.add(url)
+        # Popped URLs are unique: the frontier never queues a seen key twice
+        self.visited_count += 1
         
-        # Random delay for politeness
-        delay = random.uniform(
+        # Random delay for politeness, tracked per host so other hosts are not held up.
+        # The slot is reserved before sleeping so concurrent URLs on one host queue up.
+        host = urlparse(url).netloc
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._host_next_ok.get(host, 0.0))
+        self._host_next_ok[host] = slot + random.uniform(
             self.config["crawling"]["min_delay_seconds"],
             self.config["crawling"]["max_delay_seconds"]
         )
-        await asyncio.sleep(delay)
+        await asyncio.sleep(slot - now)
         
-        logger.info(f"🔍 Crawling [{len(self.visited_urls)}]: {url[:100]}")
+        logger.info(f"🔍 Crawling [{self.visited_count}]: {url[:100]}")
         
         # Fetch content
         content = await self.fetch(session, url)
@@ -418,15 +845,15 @@ class EnhancedDataCollector:
         if self.is_code_url(url):
             data = self.parse_code_content(content, url)
         else:
-            data = self.parse_content(content, url)
+            data, new_links = await self.parse_content(content, url)
             
-            # Extract links for further crawling
+            # Queue links found while parsing
             if data and self.config["crawling"]["follow_external_links"]:
-                new_links = self.extract_links(content, url)
                 # Add new links to queue (limit to prevent infinite crawling)
                 for link in new_links:
-                    if link not in self.visited_urls and len(self.urls_to_visit) < self.config["crawling"]["max_urls_to_crawl"]:
-                        self.urls_to_visit.add(link)
+                    if len(self.url_frontier) >= self.config["crawling"]["max_urls_to_crawl"]:
+                        break
+                    self.url_frontier.add(link)
         
         # Save data
         if data:
@@ -442,6 +869,18 @@ class EnhancedDataCollector:
             if self.running:
                 await self.save_checkpoint()
     
+    async def periodic_data_flush(self):
+        """Periodically flush buffered records so the data file stays current"""
+        interval = self.config["runtime"].get("data_flush_interval_seconds", 5)
+        while self.running:
+            await asyncio.sleep(interval)
+            if self.running and self._data_fh is not None:
+                try:
+                    async with self._data_lock:
+                        await self._data_fh.flush()
+                except Exception as e:
+                    logger.error(f"Error flushing data file: {e}")
+    
     async def periodic_stats_report(self):
         """Periodically report statistics"""
         interval = self.config["runtime"]["stats_report_interval_minutes"] * 60
@@ -464,12 +903,12 @@ class EnhancedDataCollector:
                 return False
         
         # Check if we have URLs to visit
-        if not self.urls_to_visit:
+        if not self.url_frontier:
             logger.info("📭 No more URLs to visit")
             return False
         
         # Check max URLs limit
-        if len(self.visited_urls) >= self.config["crawling"]["max_urls_to_crawl"]:
+        if self.visited_count >= self.config["crawling"]["max_urls_to_crawl"]:
             logger.info(f"🎯 Max URLs limit reached ({self.config['crawling']['max_urls_to_crawl']})")
             return False
         
@@ -493,38 +932,64 @@ class EnhancedDataCollector:
         logger.info(f"🕐 End time: {self.end_time.strftime('%Y-%m-%d %H:%M:%S')}")
         logger.info("=" * 80)
         
+        self._data_fh = await aiofiles.open(
+            self.config["output"]["data_file"], 'ab', buffering=1 << 20
+        )
+        
         # Start background tasks
         checkpoint_task = asyncio.create_task(self.periodic_checkpoint())
         stats_task = asyncio.create_task(self.periodic_stats_report())
+        flush_task = asyncio.create_task(self.periodic_data_flush())
         
-        async with aiohttp.ClientSession() as session:
-            while self.should_continue():
-                # Get batch of URLs to process
-                batch_size = min(
-                    self.config["crawling"]["max_concurrent_requests"] * 2,
-                    len(self.urls_to_visit)
-                )
-                
-                if batch_size == 0:
-                    break
-                
-                # Get URLs from queue
-                urls_batch = []
-                for _ in range(batch_size):
-                    if self.urls_to_visit:
-                        urls_batch.append(self.urls_to_visit.pop())
-                
-                # Process batch concurrently
-                tasks = [self.process_url(session, url) for url in urls_batch]
-                await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Cleanup
-        self.running = False
-        checkpoint_task.cancel()
-        stats_task.cancel()
+        # Shared keep-alive pool with DNS caching; timeouts are set once per session
+        crawling = self.config["crawling"]
+        connector = aiohttp.TCPConnector(
+            limit=crawling["max_concurrent_requests"] * 2,
+            limit_per_host=crawling.get("max_requests_per_host", 8),
+            ttl_dns_cache=300,
+            use_dns_cache=True,
+            enable_cleanup_closed=True
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=crawling["request_timeout_seconds"],
+            connect=10,
+            sock_read=30
+        )
         
-        # Final checkpoint and stats
-        await self.save_checkpoint()
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                while self.should_continue():
+                    # Get batch of URLs to process
+                    batch_size = min(
+                        self.config["crawling"]["max_concurrent_requests"] * 2,
+                        len(self.url_frontier)
+                    )
+                    
+                    if batch_size == 0:
+                        break
+                    
+                    # Get URLs from queue
+                    urls_batch = []
+                    for _ in range(batch_size):
+                        url = self.url_frontier.pop()
+                        if url:
+                            urls_batch.append(url)
+                    
+                    # Process batch concurrently
+                    tasks = [self.process_url(session, url) for url in urls_batch]
+                    await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            # Cleanup
+            self.running = False
+            checkpoint_task.cancel()
+            stats_task.cancel()
+            flush_task.cancel()
+            
+            # Final checkpoint and stats
+            await self.save_checkpoint()
+            self.url_frontier.close()
+            await self._data_fh.close()
+            self._data_fh = None
         
         logger.info("\n" + "=" * 80)
         logger.info("🎉 CRAWLING COMPLETE!")
@@ -532,8 +997,8 @@ class EnhancedDataCollector:
         
         # Save final statistics
         try:
-            async with aiofiles.open(self.config["output"]["stats_file"], 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(self.stats.to_dict(), indent=2))
+            async with aiofiles.open(self.config["output"]["stats_file"], 'wb') as f:
+                await f.write(orjson.dumps(self.stats.to_dict(), option=orjson.OPT_INDENT_2))
         except Exception as e:
             logger.error(f"Error saving final stats: {e}")
 
@@ -553,7 +1018,9 @@ async def main():
     try:
         import aiohttp
         import aiofiles
-        import bs4
+        import lxml
+        import orjson
+        import xxhash
     except ImportError:
         print("❌ Missing dependencies. Please run: pip install -r requirements.txt")
         sys.exit(1)
@@ -568,4 +1035,7 @@ async def main():
 
 
 if __name__ == "__main__":
+    # The policy must be set before asyncio.run() creates the loop
+    if UVLOOP_AVAILABLE:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     asyncio.run(main())
\ No newline at end of file
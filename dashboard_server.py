@@ -1,15 +1,22 @@
 import asyncio
 import json
 import os
+import orjson
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
 app = FastAPI(title="AI Data Collector Dashboard")
 
 # CORS middleware
@@ -34,23 +41,47 @@ class ConnectionManager:
         self.active_connections.append(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        if websocket in self.active_connections:
+            self.active_connections.remove(websocket)
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                pass
+        # Serialize once; every client receives the same text frame
+        payload = orjson.dumps(message).decode('utf-8')
+        connections = list(self.active_connections)
+        results = await asyncio.gather(
+            *(connection.send_text(payload) for connection in connections),
+            return_exceptions=True
+        )
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                self.disconnect(connection)
 
 manager = ConnectionManager()
 
+# path -> ((mtime_ns, size), value); files are re-read only after they change
+_CACHE: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+
+def cached_load(path: Path, loader: Callable[[Path], Any]) -> Any:
+    """Return loader(path), reusing the previous result while the file is unchanged"""
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    entry = _CACHE.get(str(path))
+    if entry is not None and entry[0] == key:
+        return entry[1]
+    value = loader(path)
+    _CACHE[str(path)] = (key, value)
+    return value
+
+def read_json(path: Path) -> Any:
+    """Parse a JSON file"""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
 def load_stats() -> Dict:
     """Load statistics from file"""
     stats_file = Path("crawler_stats.json")
     if stats_file.exists():
-        with open(stats_file, 'r') as f:
-            return json.load(f)
+        return cached_load(stats_file, read_json)
     return {
         "pages_crawled": 0,
         "code_files_collected": 0,
@@ -65,8 +96,7 @@ def load_checkpoint() -> Dict:
     """Load checkpoint state"""
     checkpoint_file = Path("crawler_state.json")
     if checkpoint_file.exists():
-        with open(checkpoint_file, 'r') as f:
-            return json.load(f)
+        return cached_load(checkpoint_file, read_json)
     return {
         "visited_urls": [],
         "urls_to_visit": [],
@@ -81,11 +111,11 @@ def get_recent_data(limit: int = 10) -> List[Dict]:
     
     recent = []
     try:
-        with open(data_file, 'r', encoding='utf-8') as f:
+        with open(data_file, 'rb') as f:
             lines = f.readlines()
             for line in lines[-limit:]:
                 try:
-                    recent.append(json.loads(line))
+                    recent.append(orjson.loads(line))
                 except:
                     pass
     except:
@@ -93,6 +123,9 @@ def get_recent_data(limit: int = 10) -> List[Dict]:
     
     return list(reversed(recent))
 
+# Position reached by the last count_total_items() call, so only new bytes are scanned
+_LINE_COUNT = {"inode": None, "offset": 0, "count": 0}
+
 def count_total_items() -> int:
     """Count total items in data file"""
     data_file = Path("training_data.jsonl")
@@ -100,11 +133,54 @@ def count_total_items() -> int:
         return 0
     
     try:
-        with open(data_file, 'r') as f:
-            return sum(1 for _ in f)
+        st = os.stat(data_file)
+        if st.st_ino != _LINE_COUNT["inode"] or st.st_size < _LINE_COUNT["offset"]:
+            # New or truncated file: count from the start
+            _LINE_COUNT.update(inode=st.st_ino, offset=0, count=0)
+        
+        if st.st_size > _LINE_COUNT["offset"]:
+            with open(data_file, 'rb') as f:
+                f.seek(_LINE_COUNT["offset"])
+                count = _LINE_COUNT["count"]
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    count += chunk.count(b'\n')
+                _LINE_COUNT.update(offset=f.tell(), count=count)
+        return _LINE_COUNT["count"]
     except:
         return 0
 
+STATS_PUSH_INTERVAL_SECONDS = 2
+
+def build_stats_message() -> Dict:
+    """Build the stats message sent to WebSocket clients"""
+    stats = load_stats()
+    checkpoint = load_checkpoint()
+    return {
+        "type": "stats",
+        "data": {
+            "stats": stats,
+            "queue_size": checkpoint.get("queue_size", len(checkpoint.get("urls_to_visit", []))),
+            "visited_count": checkpoint.get("visited_count", len(checkpoint.get("visited_urls", []))),
+            "total_items": count_total_items()
+        }
+    }
+
+async def push_stats():
+    """Compute stats once per interval and broadcast them to all clients"""
+    while True:
+        await asyncio.sleep(STATS_PUSH_INTERVAL_SECONDS)
+        if not manager.active_connections:
+            continue
+        try:
+            await manager.broadcast(build_stats_message())
+        except Exception as e:
+            print(f"Stats push error: {e}")
+
+@app.on_event("startup")
+async def start_stats_push():
+    """Start the single background producer for WebSocket updates"""
+    app.state.stats_push_task = asyncio.create_task(push_stats())
+
 @app.get("/")
 async def get_dashboard():
     """Serve the dashboard HTML"""
@@ -118,8 +194,8 @@ async def get_stats():
     
     return {
         "stats": stats,
-        "queue_size": len(checkpoint.get("urls_to_visit", [])),
-        "visited_count": len(checkpoint.get("visited_urls", [])),
+        "queue_size": checkpoint.get("queue_size", len(checkpoint.get("urls_to_visit", []))),
+        "visited_count": checkpoint.get("visited_count", len(checkpoint.get("visited_urls", []))),
         "total_items": count_total_items(),
         "timestamp": datetime.now().isoformat()
     }
@@ -146,46 +222,17 @@ async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time updates"""
     await manager.connect(websocket)
     try:
-        # Send initial data
-        stats = load_stats()
-        checkpoint = load_checkpoint()
-        await websocket.send_json({
-            "type": "stats",
-            "data": {
-                "stats": stats,
-                "queue_size": len(checkpoint.get("urls_to_visit", [])),
-                "visited_count": len(checkpoint.get("visited_urls", [])),
-                "total_items": count_total_items()
-            }
-        })
+        # Send initial data; later updates come from push_stats()
+        await websocket.send_text(orjson.dumps(build_stats_message()).decode('utf-8'))
         
-        # Keep connection alive and send updates
+        # Nothing is expected from the client; this only detects disconnects
         while True:
-            # Wait for messages or send periodic updates
-            try:
-                # Send stats every 2 seconds
-                await asyncio.sleep(2)
-                stats = load_stats()
-                checkpoint = load_checkpoint()
-                await websocket.send_json({
-                    "type": "stats",
-                    "data": {
-                        "stats": stats,
-                        "queue_size": len(checkpoint.get("urls_to_visit", [])),
-                        "visited_count": len(checkpoint.get("visited_urls", [])),
-                        "total_items": count_total_items()
-                    }
-                })
-            except WebSocketDisconnect:
-                break
-            except Exception as e:
-                print(f"WebSocket error: {e}")
-                break
-                
+            await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
     except Exception as e:
         print(f"WebSocket error: {e}")
+    finally:
         manager.disconnect(websocket)
 
 @app.get("/api/logs")
@@ -209,4 +256,5 @@ if __name__ == "__main__":
     print("🔌 WebSocket URL: ws://localhost:8000/ws")
     print("\nPress Ctrl+C to stop")
     
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info",
+                loop="uvloop" if UVLOOP_AVAILABLE else "asyncio")